@@ -7,21 +7,25 @@
 @license: BSD-3-clause
 '''
 import sys
+import os
+import json
+import time
+import heapq
+import argparse
+import threading
+import functools
+import itertools
 import collections
+import multiprocessing
 
 
 class Ball(object):
-    
+    # the quiz as read, stacks of color chars. search runs on Board.
+
     def __init__(self, height, stacks):
         self.height = height
         self.stacks = stacks
 
-    def clone(self):
-        return Ball(self.height, [s[:] for s in self.stacks])
-
-    def digest(self):
-        return '|'.join([''.join(s) for s in self.stacks])
-
     def show(self):
         print('----')
         for s in self.stacks:
@@ -44,13 +48,6 @@ class Ball(object):
         if len(self.stacks[y]) + n <= self.height:
             return True
 
-    @staticmethod
-    def pure(s):
-        for c in s:
-            if c != s[0]:
-                return False
-        return True
-
     @staticmethod
     def move_stack(s, d):
         c = s[-1]
@@ -62,90 +59,675 @@ class Ball(object):
             raise Exception("can't move")
         Ball.move_stack(self.stacks[x], self.stacks[y])
 
-    @staticmethod
-    def score_stack(s):
-        # 1 for each same color connected
-        if len(s) < 2:
-            return 0
-        return sum([1 if s[i] == s[i+1] else 0 for i in range(len(s)-1)])
+
+# a run of n balls in one color c, packed as c*REPEAT[n]
+REPEAT = [int.from_bytes(b'\x01'*n, 'big') for n in range(65)]
+
+
+@functools.lru_cache(maxsize=65536)
+def segments(p):
+    # (color, count) from bottom to top of a packed stack
+    segs = []
+    for c in p.to_bytes((p.bit_length()+7)//8, 'big'):
+        if segs and segs[-1][0] == c:
+            segs[-1][1] += 1
+        else:
+            segs.append([c, 1])
+    return tuple(tuple(s) for s in segs)
+
+
+class Board(object):
+    # the same quiz as Ball, made for search. each stack is an int of its
+    # balls, 8 bits per ball, and a list of (color, count) segments.
+    # move and undo change it in place.
+    __slots__ = ('height', 'segs', 'lens', 'packed', 'balls', 'nseg')
+
+    def __init__(self, height, stacks):
+        self.load(height, [int.from_bytes(bytes(map(ord, s)), 'big')
+                           for s in stacks])
+
+    @classmethod
+    def unpack(cls, height, packed):
+        b = cls.__new__(cls)
+        b.load(height, packed)
+        return b
+
+    def load(self, height, packed):
+        self.height = height
+        self.packed = list(packed)
+        self.segs = [list(segments(p)) for p in packed]
+        self.lens = [(p.bit_length()+7)//8 for p in packed]
+        self.balls = sum(self.lens)
+        self.nseg = sum(map(len, self.segs))
+
+    def to_ball(self):
+        return Ball(self.height, [[chr(c) for c, n in segs for _ in range(n)]
+                                  for segs in self.segs])
+
+    def key(self):
+        return tuple(sorted(self.packed))
 
     def score(self):
-        return sum([Ball.score_stack(s) for s in self.stacks])
+        return self.balls - self.nseg
+
+    def lower_bound(self, colors):
+        return self.nseg - colors
+
+    def pure(self, x):
+        return len(self.segs[x]) <= 1
+
+    def top(self, x):
+        return chr(self.segs[x][-1][0])
+
+    def check_move(self, x, y):
+        if not self.segs[x]:
+            return False
+        c, n = self.segs[x][-1]
+        if self.segs[y] and self.segs[y][-1][0] != c:
+            return False
+        return self.lens[y] + n <= self.height
+
+    def move(self, x, y):
+        # return how many balls moved, for undo
+        c, n = self.segs[x].pop(-1)
+        self.lens[x] -= n
+        self.packed[x] >>= 8*n
+        if self.segs[y]:
+            self.segs[y][-1] = (c, self.segs[y][-1][1] + n)
+            self.nseg -= 1
+        else:
+            self.segs[y].append((c, n))
+        self.lens[y] += n
+        self.packed[y] = self.packed[y] << 8*n | c*REPEAT[n]
+        return n
 
-    def margin(self, x, y):
-        s, d = self.stacks[x][:], self.stacks[y][:]
-        orig = Ball.score_stack(s) + Ball.score_stack(d)
-        Ball.move_stack(s, d)
-        new = Ball.score_stack(s) + Ball.score_stack(d)
-        return new - orig
+    def undo(self, x, y, n):
+        c, m = self.segs[y][-1]
+        if m == n:
+            self.segs[y].pop(-1)
+        else:
+            self.segs[y][-1] = (c, m - n)
+            self.nseg += 1
+        self.lens[y] -= n
+        self.packed[y] >>= 8*n
+        self.segs[x].append((c, n))
+        self.lens[x] += n
+        self.packed[x] = self.packed[x] << 8*n | c*REPEAT[n]
 
     def find_moves(self):
-        for x in range(len(self.stacks)):
-            if len(self.stacks[x]) == 0:
+        # all empty stacks are the same, only the first one is tried.
+        # margin: merging into the same color connects one more pair.
+        tops, empty = collections.defaultdict(list), None
+        for y, segs in enumerate(self.segs):
+            if segs:
+                tops[segs[-1][0]].append(y)
+            elif empty is None:
+                empty = y
+        for x, segs in enumerate(self.segs):
+            if not segs:
                 continue
-            for y in range(len(self.stacks)):
-                # from x, to y
-                if y == x:
-                    continue
-                if self.check_move(x, y):
-                    yield x, y, self.margin(x, y)
+            c, n = segs[-1]
+            for y in tops[c]:
+                if y != x and self.lens[y] + n <= self.height:
+                    yield x, y, 1
+            if empty is not None:
+                yield x, empty, 0
+
+
+class Progress(threading.Thread):
+    # print stats of a Resolver every interval seconds, till stop.
+
+    def __init__(self, resolver, interval=1.0, fo=sys.stderr):
+        super().__init__(daemon=True)
+        self.resolver = resolver
+        self.interval = interval
+        self.fo = fo
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            s = self.resolver.stats()
+            print(f"{s['time']:.1f}s nodes={s['nodes']} "
+                  f"{s['nodes_per_sec']:.0f}/s dup={s['duplicates']} "
+                  f"dead={s['dead_hits']} pure={s['pure_to_empty']} "
+                  f"branching={s['branching']:.2f} best={s['length']}",
+                  file=self.fo, flush=True)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class DeadCache(object):
+    # keys of boards known to have no solution, for one height.
+    # the least recently used key is dropped when it's full.
+    # file is MAGIC and records of height and stacks in 2 bytes each,
+    # and height bytes a stack. records of other heights are kept when saved.
+    MAGIC = b'BALLDEAD'
+
+    def __init__(self, height, max_size=1000000):
+        if not 0 < height < 0x10000:
+            raise Exception(f'height {height} can not be kept in dead cache')
+        self.height = height
+        self.max_size = max_size
+        self.keys = collections.OrderedDict()
+        # keys added since last take, only when tracked
+        self.added = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        if key not in self.keys:
+            return False
+        self.keys.move_to_end(key)
+        return True
+
+    def add(self, key):
+        self.keys[key] = None
+        self.keys.move_to_end(key)
+        if len(self.keys) > self.max_size:
+            self.keys.popitem(last=False)
+        if self.added is not None:
+            self.added.append(key)
+
+    def track(self):
+        # workers send keys they found back, to be saved in the parent
+        self.added = []
+
+    def take(self):
+        added, self.added = self.added, []
+        return added
+
+    @classmethod
+    def read(cls, path):
+        with open(path, 'rb') as fi:
+            data = fi.read()
+        if not data.startswith(cls.MAGIC):
+            raise Exception(f'{path} is not a dead cache')
+        i = len(cls.MAGIC)
+        while i < len(data):
+            height = int.from_bytes(data[i:i+2], 'big')
+            n = int.from_bytes(data[i+2:i+4], 'big')
+            i += 4
+            yield height, tuple(
+                int.from_bytes(data[j:j+height], 'big')
+                for j in range(i, i+n*height, height))
+            i += n*height
+
+    def load(self, path):
+        # oldest first, so the order of LRU is restored
+        for height, key in self.read(path):
+            if height == self.height:
+                self.add(key)
+
+    def save(self, path):
+        try:
+            others = [r for r in self.read(path) if r[0] != self.height]
+        except FileNotFoundError:
+            others = []
+        records = others + [(self.height, key) for key in self.keys]
+        # packed before the file is truncated, so an error leaves it as is
+        data = b''.join(
+            height.to_bytes(2, 'big') + len(key).to_bytes(2, 'big') +
+            b''.join(p.to_bytes(height, 'big') for p in key)
+            for height, key in records)
+        with open(path, 'wb') as fo:
+            fo.write(self.MAGIC)
+            fo.write(data)
+
+
+def show_steps(steps):
+    for i in range(int(len(steps)/4)+1):
+        if not steps[i*4:i*4+4]:
+            continue
+        print(', \t'.join(['%s %d to %d' % s for s in steps[i*4:i*4+4]]))
 
 
 class Resolver(object):
     # DFS
 
-    def __init__(self, n, max_depth):
+    def __init__(self, n, max_depth, verbose=True, dead=None):
+        # n for colors
         self.n = n
         self.max_depth = max_depth
-        self.path, self.steps = [], []
+        self.verbose = verbose
+        self.path, self.steps = set(), []
+        # the shallowest depth each state has been searched from
+        self.seen = {}
+        # states with no solution, it's created at the first search if None
+        self.dead = dead
+        # counters for stats
+        self.expanded, self.children = 0, 0
+        self.duplicates, self.dead_hits, self.pruned = 0, 0, 0
+        self.start = time.time()
+        self.best = None
+        self.nodes = 0
+        # max_depth shared with other processes, and when to give up
+        self.bound, self.deadline = None, None
 
     def show_steps(self):
-        for i in range(int(len(self.steps)/4)+1):
-            if not self.steps[i*4:i*4+4]:
-                continue
-            print(', \t'.join(['%s %d to %d' % s for s in self.steps[i*4:i*4+4]]))
+        show_steps(self.steps)
 
-    def search(self, quiz):
-        if len(self.path) >= self.max_depth:
-            return
-        if quiz.score() >= 3*self.n:
-            self.max_depth = len(self.path)
+    def sync(self):
+        if self.bound is not None:
+            self.max_depth = min(self.max_depth, self.bound.value)
+        if self.deadline is not None and time.time() > self.deadline:
+            # nothing could go deeper than 0, so everything returns now
+            self.max_depth = 0
+
+    def found(self, depth):
+        self.max_depth = depth
+        self.best = self.steps[:]
+        if self.bound is not None:
+            with self.bound.get_lock():
+                self.bound.value = min(self.bound.value, depth)
+        if self.verbose:
             print(self.max_depth)
             self.show_steps()
-            return
-        self.path.append(quiz.digest())
+
+    def stats(self):
+        # duplicates are states on the path, or searched with more steps left
+        t = time.time() - self.start
+        return {'nodes': self.nodes, 'expanded': self.expanded,
+                'duplicates': self.duplicates, 'dead_hits': self.dead_hits,
+                'pure_to_empty': self.pruned,
+                'branching': self.children / self.expanded
+                if self.expanded else 0.0,
+                'nodes_per_sec': self.nodes / t if t else 0.0,
+                'time': t, 'max_depth': self.max_depth,
+                'length': None if self.best is None else len(self.best)}
+
+    def search(self, quiz):
+        # Ball is taken as well, it's searched as a Board.
+        if isinstance(quiz, Ball):
+            quiz = Board(quiz.height, quiz.stacks)
+        return self.search_board(quiz)
+
+    def search_board(self, quiz):
+        # return True if there is no solution from quiz, whatever the depth.
+        if self.dead is None:
+            self.dead = DeadCache(quiz.height)
+        self.nodes += 1
+        if self.nodes % 1024 == 0:
+            self.sync()
+        depth = len(self.steps)
+        if depth >= self.max_depth:
+            return False
+        if quiz.lower_bound(self.n) <= 0:
+            self.found(depth)
+            return False
+        d = quiz.key()
+        # searched from here before, with at least as many steps left
+        if self.seen.get(d, self.max_depth) <= depth:
+            self.duplicates += 1
+            return False
+        self.seen[d] = depth
+        self.path.add(d)
+        self.expanded += 1
+        # dead only if every move goes to a dead state. a move back to the
+        # path, or one cut by depth or seen, may have solution.
+        dead = True
         moves = sorted(quiz.find_moves(), key=lambda k: -k[2])
         for x, y, _ in moves:
-            if Ball.pure(quiz.stacks[x]) and not quiz.stacks[y]:
+            if quiz.pure(x) and not quiz.segs[y]:
                 # don't move from a pure color stack to an empty stack
+                self.pruned += 1
                 continue
             # print(f'{x} to {y}')
-            c = quiz.clone()
-            b = c.stacks[x][-1]
-            c.move(x, y)
-            if c.digest() in self.path:
+            b = quiz.top(x)
+            n = quiz.move(x, y)
+            k = quiz.key()
+            if k in self.dead:
+                self.dead_hits += 1
+            elif k in self.path:
+                self.duplicates += 1
+                dead = False
+            else:
+                self.children += 1
+                self.steps.append((b, x+1, y+1))
+                if not self.search_board(quiz):
+                    dead = False
+                self.steps.pop(-1)
+            quiz.undo(x, y, n)
+        self.path.remove(d)
+        if dead:
+            self.dead.add(d)
+        return dead
+
+
+_dead = {}
+
+
+def dead_cache(height, path=None, max_size=1000000, track=False):
+    # one cache for each height in a process, shared by searches in it
+    if height not in _dead:
+        _dead[height] = DeadCache(height, max_size)
+        if path and os.path.exists(path):
+            _dead[height].load(path)
+    if track and _dead[height].added is None:
+        _dead[height].track()
+    return _dead[height]
+
+
+def save_dead(path, found, max_size=1000000):
+    # merge keys found by workers, as {height: [key]}, into the file
+    for height, keys in found.items():
+        dead = DeadCache(height, max_size)
+        if os.path.exists(path):
+            dead.load(path)
+        for key in keys:
+            dead.add(key)
+        dead.save(path)
+
+
+_bound, _deadline, _seen, _dead_file, _dead_size = None, None, None, None, None
+
+
+def init_worker(bound, deadline, dead_file=None, dead_size=1000000):
+    global _bound, _deadline, _seen, _dead_file, _dead_size
+    _bound, _deadline = bound, deadline
+    _dead_file, _dead_size = dead_file, dead_size
+    # depths are counted from the root, so parts in one worker share it
+    _seen = {}
+
+
+def search_part(part):
+    packed, steps, height, n = part
+    dead = dead_cache(height, _dead_file, _dead_size, bool(_dead_file))
+    r = Resolver(n, _bound.value, verbose=False, dead=dead)
+    r.bound, r.deadline, r.seen = _bound, _deadline, _seen
+    r.steps = list(steps)
+    r.search(Board.unpack(height, packed))
+    return r.best, dead.take() if _dead_file else []
+
+
+def split(quiz, plies):
+    # distinct states after a few moves, with the steps to them
+    colors = len({c for segs in quiz.segs for c, _ in segs})
+    parts = [(tuple(quiz.packed), [])]
+    seen = {quiz.key()}
+    for _ in range(plies):
+        nexts = []
+        for packed, steps in parts:
+            b = Board.unpack(quiz.height, packed)
+            if b.lower_bound(colors) == 0:
+                nexts.append((packed, steps))
+                continue
+            for x, y, _ in b.find_moves():
+                if b.pure(x) and not b.segs[y]:
+                    continue
+                c = b.top(x)
+                n = b.move(x, y)
+                if b.key() not in seen:
+                    seen.add(b.key())
+                    nexts.append((tuple(b.packed), steps+[(c, x+1, y+1)]))
+                b.undo(x, y, n)
+        parts = nexts
+    return parts
+
+
+def search_parallel(quiz, n, max_depth, jobs=None, timeout=None, plies=2,
+                    dead_file=None, dead_size=1000000):
+    # subtrees of the first plies run in a pool, sharing max_depth.
+    # dead_file is loaded by workers, and saved with what they found.
+    bound = multiprocessing.Value('i', max_depth)
+    deadline = time.time() + timeout if timeout else None
+    parts = sorted(split(quiz, plies),
+                   key=lambda p: Board.unpack(quiz.height, p[0]).nseg)
+    best, found = None, []
+    with multiprocessing.Pool(jobs, init_worker,
+                              (bound, deadline, dead_file, dead_size)) as pool:
+        for steps, keys in pool.imap_unordered(
+                search_part, [(p, s, quiz.height, n) for p, s in parts]):
+            found.extend(keys)
+            if steps is not None and (best is None or len(steps) < len(best)):
+                best = steps
+    if dead_file:
+        save_dead(dead_file, {quiz.height: found}, dead_size)
+    return best
+
+
+class AStar(object):
+    # A* with lower_bound, gives the shortest steps.
+    # it gives up after max_nodes expanded, or at deadline.
+
+    def __init__(self, max_nodes=None, deadline=None):
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        self.nodes = 0
+        self.steps = []
+        self.gave_up = False
+
+    def search(self, quiz):
+        # queue keeps packed stacks only, the board is rebuilt when expanded.
+        if isinstance(quiz, Ball):
+            quiz = Board(quiz.height, quiz.stacks)
+        colors = len({c for segs in quiz.segs for c, _ in segs})
+        counter = itertools.count()
+        best, parents = {quiz.key(): 0}, {}
+        queue = [(quiz.lower_bound(colors), 0, next(counter),
+                  tuple(quiz.packed), None, None)]
+        while queue:
+            # deeper first in the same f, it's closer to the end
+            _, g, _, packed, prev, step = heapq.heappop(queue)
+            g = -g
+            b = Board.unpack(quiz.height, packed)
+            d = b.key()
+            if d in parents:
                 continue
-            self.steps.append((b, x+1, y+1))
-            self.search(c)
-            self.steps.pop(-1)
-        self.path.pop(-1)
+            parents[d] = (prev, step)
+            if b.lower_bound(colors) == 0:
+                self.steps = self.trace(parents, d)
+                return self.steps
+            self.nodes += 1
+            if self.max_nodes is not None and self.nodes > self.max_nodes:
+                self.gave_up = True
+                return
+            if self.deadline is not None and self.nodes % 1024 == 0 and \
+                    time.time() > self.deadline:
+                self.gave_up = True
+                return
+            for x, y, _ in b.find_moves():
+                if b.pure(x) and not b.segs[y]:
+                    continue
+                c = b.top(x)
+                n = b.move(x, y)
+                k = b.key()
+                if k not in parents and best.get(k, g+2) > g+1:
+                    best[k] = g+1
+                    heapq.heappush(queue, (g+1+b.lower_bound(colors), -g-1,
+                                           next(counter), tuple(b.packed), d,
+                                           (c, x+1, y+1)))
+                b.undo(x, y, n)
+
+    @staticmethod
+    def trace(parents, d):
+        steps = []
+        while parents[d][0] is not None:
+            d, step = parents[d]
+            steps.append(step)
+        return steps[::-1]
+
+
+def colors(quiz):
+    return len({c for s in quiz.stacks for c in s})
 
 
 # R - Red, G - Green, B - Blue, Y - Yellow
 # C - Cyan, S - Silver, O - Olive, V - Violet, P - Pink
-def main():
-    with open(sys.argv[1]) as fi:
-        ballquiz = fi.read().upper()
-    c = collections.Counter(ballquiz)
+def parse(text, height=None, spare=2):
+    # one stack for one line, from bottom to top.
+    # a line like "# height=5 spare=1" overwrites the defaults, other words
+    # in it are ignored.
+    opts, quiz = {}, []
+    for l in text.splitlines():
+        l = l.strip()
+        if l.startswith('#'):
+            opts.update((k.lower(), int(v)) for k, v in
+                        (kv.split('=', 1) for kv in l[1:].split() if '=' in kv)
+                        if v.isdigit())
+        elif l:
+            quiz.append(list(l.upper()))
+    if not quiz:
+        raise Exception('no stack in quiz')
+    c = collections.Counter(b for s in quiz for b in s)
+    height = opts.get('height', height) or max(c.values())
+    spare = opts.get('spare', spare)
     for k, v in c.items():
-        if k == '\n' or v == 4:
-            continue
-        print(f'{k} not qeual')
-    quiz = [list(l) for l in ballquiz.splitlines() if l]
-    b = Ball(4, quiz+[[], []])
+        if v != height:
+            raise Exception(f'{v} balls of {k}, not {height}')
+    for s in quiz:
+        if len(s) > height:
+            raise Exception(f'stack {"".join(s)} is higher than {height}')
+    return Ball(height, quiz+[[] for _ in range(spare)])
+
+
+def read_quizzes(fi):
+    # quizzes are split by empty lines
+    lines = []
+    for l in fi:
+        if l.strip():
+            lines.append(l)
+        elif lines:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def solve(job):
+    # a bad quiz gives a record of error, others in batch go on
+    try:
+        return solve_quiz(*job)
+    except Exception as e:
+        return {'index': job[0], 'error': f'{type(e).__name__}: {e}'}
+
+
+def solve_quiz(i, text, height, spare, astar, timeout, dead_file, dead_size,
+               max_nodes):
+    b = parse(text, height, spare)
+    start = time.time()
+    if astar:
+        r = AStar(max_nodes, start + timeout if timeout else None)
+        steps = r.search(Board(b.height, b.stacks))
+    else:
+        dead = dead_cache(b.height, dead_file, dead_size, bool(dead_file))
+        r = Resolver(colors(b), 100, verbose=False, dead=dead)
+        if timeout:
+            r.deadline = start + timeout
+        r.search(Board(b.height, b.stacks))
+        steps = r.best
+    result = {'index': i, 'solution': steps,
+              'length': None if steps is None else len(steps),
+              'nodes': r.nodes, 'time': time.time() - start}
+    if astar:
+        result['gave_up'] = r.gave_up
+    else:
+        result['stats'] = r.stats()
+        if dead_file:
+            result['dead'] = (b.height, dead.take())
+    return result
+
+
+def solve_batch(fi, height=None, spare=2, astar=False, timeout=None,
+                jobs=None, dead_file=None, dead_size=1000000, max_nodes=None):
+    # results come out as soon as they are done, with index of the quiz.
+    # dead states are shared by quizzes solved in the same worker,
+    # and those found are saved into dead_file at the end.
+    tasks = ((i, text, height, spare, astar, timeout, dead_file, dead_size,
+              max_nodes)
+             for i, text in enumerate(read_quizzes(fi)))
+    found = {}
+    try:
+        with multiprocessing.Pool(jobs) as pool:
+            for r in pool.imap_unordered(solve, tasks):
+                if 'dead' in r:
+                    h, keys = r.pop('dead')
+                    found.setdefault(h, []).extend(keys)
+                yield r
+    finally:
+        if dead_file:
+            save_dead(dead_file, found, dead_size)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--astar', '-a', action='store_true', default=False,
+                        help='find the shortest steps with A*')
+    parser.add_argument('--jobs', '-j', type=int,
+                        help='search in parallel with this many processes')
+    parser.add_argument('--timeout', '-t', type=float,
+                        help='give up search after seconds')
+    parser.add_argument('--max-nodes', type=int,
+                        help='give up A* after this many nodes expanded')
+    parser.add_argument('--plies', type=int, default=2,
+                        help='moves to split the parallel search at')
+    parser.add_argument('--height', type=int,
+                        help='height of stacks, balls of one color by default')
+    parser.add_argument('--spare', type=int, default=2,
+                        help='empty stacks')
+    parser.add_argument('--batch', '-b', action='store_true', default=False,
+                        help='solve all quizzes in file, output json lines')
+    parser.add_argument('--dead-cache', '-d',
+                        help='file of states with no solution, reused by DFS')
+    parser.add_argument('--dead-size', type=int, default=1000000,
+                        help='max states kept in dead cache')
+    parser.add_argument('--progress', '-p', type=float,
+                        help='print stats of DFS every seconds to stderr')
+    parser.add_argument('--stats', '-s', action='store_true', default=False,
+                        help='print stats of DFS as json at the end')
+    parser.add_argument('file')
+    args = parser.parse_args()
+
+    if args.batch:
+        with open(args.file) as fi:
+            for r in solve_batch(fi, args.height, args.spare, args.astar,
+                                 args.timeout, args.jobs, args.dead_cache,
+                                 args.dead_size, args.max_nodes):
+                print(json.dumps(r), flush=True)
+        return
+
+    with open(args.file) as fi:
+        b = parse(fi.read(), args.height, args.spare)
     b.show()
-    r = Resolver(len(quiz), 100)
+    n = colors(b)
+    b = Board(b.height, b.stacks)
+    if args.astar:
+        r = AStar(args.max_nodes,
+                  time.time() + args.timeout if args.timeout else None)
+        if r.search(b) is None:
+            if r.gave_up:
+                print(f'gave up after {r.nodes} nodes expanded')
+            else:
+                print('no solution')
+            return
+        print(f'{len(r.steps)} steps, {r.nodes} nodes expanded')
+        show_steps(r.steps)
+        return
+    if args.jobs:
+        steps = search_parallel(b, n, 100, args.jobs, args.timeout,
+                                args.plies, args.dead_cache, args.dead_size)
+        if steps is None:
+            print('no solution')
+            return
+        print(len(steps))
+        show_steps(steps)
+        return
+    dead = dead_cache(b.height, args.dead_cache, args.dead_size)
+    r = Resolver(n, 100, dead=dead)
+    if args.timeout:
+        r.deadline = time.time() + args.timeout
+    if args.progress:
+        progress = Progress(r, args.progress)
+        progress.start()
     r.search(b)
+    if args.progress:
+        progress.stop()
+    if args.stats:
+        print(json.dumps(r.stats()))
+    if args.dead_cache:
+        dead.save(args.dead_cache)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+'''
+@date: 2026-10-18
+@author: Shell.Xu
+@copyright: 2026, Shell.Xu <shell909090@gmail.com>
+@license: BSD-3-clause
+@comment:
+Generate random ballsort quizzes, solved by A* to make sure they are
+solvable, rated by the length of the shortest steps and nodes expanded.
+Output could be read by balls.py -b.
+'''
+import sys
+import json
+import random
+import argparse
+import multiprocessing
+
+from balls import Ball, Board, AStar
+
+
+COLORS = 'RGBYCSOVPKWMLTNADEFHIJQUXZ'
+
+
+def random_quiz(rnd, colors, height, spare):
+    balls = list(COLORS[:colors]*height)
+    rnd.shuffle(balls)
+    return Ball(height, [balls[i*height:i*height+height]
+                         for i in range(colors)] + [[] for _ in range(spare)])
+
+
+def rate(job):
+    # None if it's unsolvable, already done, or too hard to prove.
+    seed, colors, height, spare, max_nodes = job
+    b = random_quiz(random.Random(seed), colors, height, spare)
+    r = AStar(max_nodes)
+    steps = r.search(Board(b.height, b.stacks))
+    if not steps:
+        return
+    return {'seed': seed, 'height': height, 'spare': spare,
+            'stacks': [''.join(s) for s in b.stacks if s],
+            'length': len(steps), 'nodes': r.nodes}
+
+
+def generate(n, colors, height=4, spare=2, seed=0, max_nodes=100000,
+             min_length=0, jobs=None, max_tries=10000):
+    # try seeds in rounds, until n quizzes are found, or max_tries seeds
+    # have been tried.
+    count, end = 0, seed + max_tries
+    with multiprocessing.Pool(jobs) as pool:
+        while count < n and seed < end:
+            tasks = [(s, colors, height, spare, max_nodes)
+                     for s in range(seed, min(seed+n-count, end))]
+            seed += len(tasks)
+            for q in pool.imap_unordered(rate, tasks):
+                if q is None or q['length'] < min_length or count >= n:
+                    continue
+                count += 1
+                yield q
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', '-n', type=int, default=10)
+    parser.add_argument('--colors', '-c', type=int, default=9)
+    parser.add_argument('--height', type=int, default=4)
+    parser.add_argument('--spare', type=int, default=2)
+    parser.add_argument('--seed', '-s', type=int, default=0)
+    parser.add_argument('--max-nodes', type=int, default=100000,
+                        help='give up quizzes harder than this')
+    parser.add_argument('--min-length', type=int, default=0,
+                        help='drop quizzes easier than this')
+    parser.add_argument('--max-tries', type=int, default=10000,
+                        help='seeds to try at most')
+    parser.add_argument('--jobs', '-j', type=int)
+    parser.add_argument('--json', action='store_true', default=False)
+    args = parser.parse_args()
+
+    count = 0
+    for q in generate(args.number, args.colors, args.height, args.spare,
+                      args.seed, args.max_nodes, args.min_length, args.jobs,
+                      args.max_tries):
+        count += 1
+        if args.json:
+            print(json.dumps(q), flush=True)
+            continue
+        print(f"# height={q['height']} spare={q['spare']} "
+              f"seed={q['seed']} length={q['length']} nodes={q['nodes']}")
+        print('\n'.join(q['stacks']))
+        print(flush=True)
+    if count < args.number:
+        print(f'only {count} of {args.number} quizzes found in '
+              f'{args.max_tries} seeds', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
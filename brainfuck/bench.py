@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+'''
+@date: 2026-10-18
+@author: Shell.Xu
+@copyright: 2026, Shell.Xu <shell909090@gmail.com>
+@license: BSD-3-clause
+@comment:
+Benchmark of brainfuck engines.
+Each .bf in the corpus runs on each engine, the output is checked with the
+.out file beside it. ops is the number of ops of the plain compiled program,
+so ops/sec could be compared between engines. peak memory is traced by
+tracemalloc in the first run, which is not timed. if repeat is 1, the traced
+run is one more.
+'''
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+
+from interpreter import Env
+
+
+ENGINES = {
+    'compiled': {'optimize': False, 'engine': 'interp'},
+    'optimized': {'optimize': True, 'engine': 'interp'},
+    'transpile': {'optimize': True, 'engine': 'transpile'},
+}
+
+
+def read_file(fn, mode='r', default=None):
+    if not os.path.exists(fn):
+        return default
+    with open(fn, mode) as fi:
+        return fi.read()
+
+
+def load_corpus(paths):
+    for p in paths:
+        fns = [p]
+        if os.path.isdir(p):
+            fns = [os.path.join(p, fn) for fn in sorted(os.listdir(p))
+                   if fn.endswith('.bf')]
+        for fn in fns:
+            base = os.path.splitext(fn)[0]
+            yield (os.path.basename(base), read_file(fn),
+                   read_file(base+'.in', 'rb', b''),
+                   read_file(base+'.out', 'rb'))
+
+
+def run_once(code, data, kw, trace=False):
+    # peak is the most memory allocated by python in this run, if traced.
+    fo = io.BytesIO()
+    if trace:
+        tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        env = Env(fi=io.BytesIO(data), fo=fo, **kw)
+        env.eval(code)
+        t = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace else None
+    finally:
+        if trace:
+            tracemalloc.stop()
+    return t, env.steps, fo.getvalue(), peak
+
+
+def bench(corpus, engines, repeat=3):
+    for name, code, data, expected in corpus:
+        ops = None
+        for engine in engines:
+            kw = ENGINES[engine]
+            best, output = None, None
+            # tracing is slow, so the traced run is not timed. it takes the
+            # place of the first run, or it's one more if there is only one.
+            peak = run_once(code, data, kw, True)[3]
+            for _ in range(max(repeat-1, 1)):
+                t, steps, output, _ = run_once(code, data, kw)
+                best = t if best is None else min(best, t)
+                if engine == 'compiled':
+                    ops = steps
+            if ops is None:
+                # compiled engine is not in the list, count it once.
+                ops = run_once(code, data, ENGINES['compiled'])[1]
+            yield {'program': name, 'engine': engine, 'time': best,
+                   'ops': ops, 'ops_per_sec': ops / best,
+                   'peak_memory': peak,
+                   'ok': expected is None or output == expected}
+
+
+def compare(results, baseline, threshold):
+    # slower than baseline by more than threshold is a regression.
+    base = {(r['program'], r['engine']): r for r in baseline['results']}
+    for r in results:
+        b = base.get((r['program'], r['engine']))
+        if b is None:
+            continue
+        ratio = r['time'] / b['time']
+        if ratio > 1 + threshold:
+            yield r['program'], r['engine'], ratio
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--engine', '-e', action='append',
+                        choices=sorted(ENGINES))
+    parser.add_argument('--repeat', '-r', type=int, default=3)
+    parser.add_argument('--output', '-o', help='save results as json')
+    parser.add_argument('--baseline', '-b', help='compare with this json')
+    parser.add_argument('--threshold', '-t', type=float, default=0.1)
+    parser.add_argument('corpus', nargs='*')
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error('--repeat should be at least 1')
+
+    corpus = args.corpus or [
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench')]
+    engines = args.engine or list(ENGINES)
+
+    results = []
+    for r in bench(load_corpus(corpus), engines, args.repeat):
+        results.append(r)
+        print(f"{r['program']}\t{r['engine']}\t{r['time']:.3f}s\t"
+              f"{r['ops_per_sec']:.0f} ops/s\t{r['peak_memory']} bytes\t"
+              f"{'ok' if r['ok'] else 'WRONG OUTPUT'}")
+
+    if args.output:
+        with open(args.output, 'w') as fo:
+            json.dump({'python': platform.python_version(),
+                       'results': results}, fo, indent=2)
+
+    failed = not all(r['ok'] for r in results)
+    if args.baseline:
+        with open(args.baseline) as fi:
+            baseline = json.load(fi)
+        for program, engine, ratio in compare(results, baseline,
+                                              args.threshold):
+            print(f'regression: {program} on {engine} {ratio:.2f}x slower',
+                  file=sys.stderr)
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+mandel: iterate z = z*z plus c mod 16 over a 16x8 grid and draw it
+
+>[-]++++++++>>[-]<<[->>+++++>[-]<<[-]++++++++++++++++[->>+++>[-]>[-]++++++++[-
+>>>>[-]>>>>>>>>>>[-]<<<<<<<<<<<<<<<[-
+>>>>>+>>>>>>>>>>+<<<<<<<<<<<<<<<]>>>>>>>>>>>>>>>[-
+<<<<<<<<<<<<<<<+>>>>>>>>>>>>>>>]<<<<<<<<<[-]>>>>>>>>>[-]<<<<<<<<<<<<<<<[-
+>>>>>>+>>>>>>>>>+<<<<<<<<<<<<<<<]>>>>>>>>>>>>>>>[-
+<<<<<<<<<<<<<<<+>>>>>>>>>>>>>>>]<<<<<<<<[-]<<[->[-
+>+>>>>>>>>+<<<<<<<<<]>>>>>>>>>[-<<<<<<<<<+>>>>>>>>>]<<<<<<<<<<]>[-]>>>>>>>>>[-
+]>[-]<<<<<<<<<<<<<<<<<[-
+>>>>>>>>>>>>>>>>+>+<<<<<<<<<<<<<<<<<]>>>>>>>>>>>>>>>>>[-
+<<<<<<<<<<<<<<<<<+>>>>>>>>>>>>>>>>>]<[-<<<<<<<<+>>>>>>>>][-]>[-
+]<<<<<<<<<<<<<<<<<<[-
+>>>>>>>>>>>>>>>>>+>+<<<<<<<<<<<<<<<<<<]>>>>>>>>>>>>>>>>>>[-
+<<<<<<<<<<<<<<<<<<+>>>>>>>>>>>>>>>>>>]<[-<<<<<<<<+>>>>>>>>]<<<<<<<<+<<<<<<<[-
+]>>>>>>>[-
+>>>>>>>>>>>>>>>>>>>>>>>>>>>>+<<<<<<<<<<<<<<<<<<<<<<<<<<<<]>>>>>>>>>>>>>>>>>>>>>
+>>>>>>>>[-]++++++++++++++++<[->-[>+>>]>[+[-<+>]>+>>]<<<<<]>>[-
+<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<+>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>]<<[
+-]>[-]>[-]>[-]>[-]<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<]>>>>>>>>>>>>>>[-]>[-
+]<<<<<<<<<<<<<<<<[->>>>>>>>>>>>>>>+>+<<<<<<<<<<<<<<<<]>>>>>>>>>>>>>>>>[-
+<<<<<<<<<<<<<<<<+>>>>>>>>>>>>>>>>]<++++++++++++++++++++++++++++++++++++++++++++
++++++++++++++++++++++.[-]<<<<<<<<<<<<<<<<<<]>>>>>>>>>>>>>>>>>>[-]++++++++++.[-
+]<<<<<<<<<<<<<<<<<<<]
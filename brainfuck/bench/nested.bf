@@ -0,0 +1,28 @@
+nested: three nested loops of 24 with a 24 bit counter then print it
+
+>>>>[-]++++++++++++++++++++++++[->[-]++++++++++++++++++++++++[->[-
+]++++++++++++++++++++++++[-<<<<<+>>>>>>[-]+>[-]>[-]<<<<<<<<[-
+>>>>>>>+>+<<<<<<<<]>>>>>>>>[-<<<<<<<<+>>>>>>>>]<[<[-]>[-
+]]<[<<<<<+>>>>>>>>>>>>>>>>>>>>>>>>>>>>[-]+<<<<<<<<<<<<<<<<<<<<<<[-]>[-
+]<<<<<<<[->>>>>>+>+<<<<<<<]>>>>>>>[-<<<<<<<+>>>>>>>]<[>>>>>>>>>>>>>>>>>>>>>>[-
+]<<<<<<<<<<<<<<<<<<<<<<[-
+]]>>>>>>>>>>>>>>>>>>>>>>[<<<<<<<<<<<<<<<<<<<<<<<<<<<+>>>>>>>>>>>>>>>>>>>>>>>>>>
+>[-]]<<<<<<<<<<<<<<<<<<<<<<<[-]]<]<]<]>>>>>>[-]>>>>>>>>[-]<<<<<<<<<<<<<<<[-
+>>>>>>>+>>>>>>>>+<<<<<<<<<<<<<<<]>>>>>>>>>>>>>>>[-
+<<<<<<<<<<<<<<<+>>>>>>>>>>>>>>>]<<<<<<<[-]++++++++++<[->-[>+>>]>[+[-
+<+>]>+>>]<<<<<]>>>>[-]++++++++++<[->-[>+>>]>[+[-
+<+>]>+>>]<<<<<]>>>++++++++++++++++++++++++++++++++++++++++++++++++.<+++++++++++
++++++++++++++++++++++++++++++++++++++.<<<++++++++++++++++++++++++++++++++++++++
+++++++++++.<<[-]>[-]>[-]>[-]>[-]>[-]>[-]>[-]>[-]<<<<<<<<[-]>>>>>>>>[-
+]<<<<<<<<<<<<<<<<[->>>>>>>>+>>>>>>>>+<<<<<<<<<<<<<<<<]>>>>>>>>>>>>>>>>[-
+<<<<<<<<<<<<<<<<+>>>>>>>>>>>>>>>>]<<<<<<<[-]++++++++++<[->-[>+>>]>[+[-
+<+>]>+>>]<<<<<]>>>>[-]++++++++++<[->-[>+>>]>[+[-
+<+>]>+>>]<<<<<]>>>++++++++++++++++++++++++++++++++++++++++++++++++.<+++++++++++
++++++++++++++++++++++++++++++++++++++.<<<++++++++++++++++++++++++++++++++++++++
+++++++++++.<<[-]>[-]>[-]>[-]>[-]>[-]>[-]>[-]>[-]<<<<<<<<[-]>>>>>>>>[-
+]<<<<<<<<<<<<<<<<<[->>>>>>>>>+>>>>>>>>+<<<<<<<<<<<<<<<<<]>>>>>>>>>>>>>>>>>[-
+<<<<<<<<<<<<<<<<<+>>>>>>>>>>>>>>>>>]<<<<<<<[-]++++++++++<[->-[>+>>]>[+[-
+<+>]>+>>]<<<<<]>>>>[-]++++++++++<[->-[>+>>]>[+[-
+<+>]>+>>]<<<<<]>>>++++++++++++++++++++++++++++++++++++++++++++++++.<+++++++++++
++++++++++++++++++++++++++++++++++++++.<<<++++++++++++++++++++++++++++++++++++++
+++++++++++.<<[-]>[-]>[-]>[-]>[-]>[-]>[-]>[-]>[-]<<<<<<<<<[-]++++++++++.
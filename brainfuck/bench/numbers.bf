@@ -0,0 +1,10 @@
+numbers: print 1 to 255 in decimal eight times
+
+>>>[-]++++++++[-<<[-]>[-]-[-<+>>>>>>>>>[-]>>>>>>>>[-]<<<<<<<<<<<<<<<<<[-
+>>>>>>>>>+>>>>>>>>+<<<<<<<<<<<<<<<<<]>>>>>>>>>>>>>>>>>[-
+<<<<<<<<<<<<<<<<<+>>>>>>>>>>>>>>>>>]<<<<<<<[-]++++++++++<[->-[>+>>]>[+[-
+<+>]>+>>]<<<<<]>>>>[-]++++++++++<[->-[>+>>]>[+[-
+<+>]>+>>]<<<<<]>>>++++++++++++++++++++++++++++++++++++++++++++++++.<+++++++++++
++++++++++++++++++++++++++++++++++++++.<<<++++++++++++++++++++++++++++++++++++++
+++++++++++.<<[-]>[-]>[-]>[-]>[-]>[-]>[-]>[-]>[-]<<<<<<<<<[-]++++++++++.[-
+]<<<<<<<]>]
@@ -11,88 +11,614 @@ https://en.wikipedia.org/wiki/Brainfuck
 https://gist.github.com/roachhd/dce54bec8ba55fb17d3a
 Test code: +++++++++[>+++++++++>++++++++<<-]>++++++.---.>--.
 '''
+import io
+import os
 import sys
+import json
+import mmap
+import time
+import array
 import argparse
+import functools
+import collections
+import multiprocessing
+
+
+OP_ADD, OP_MOVE, OP_OPEN, OP_CLOSE, OP_IN, OP_OUT,\
+    OP_SET, OP_MULADD, OP_SCAN = range(9)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_code(code):
+    # runs of +- and <> fold into one add/move, brackets get their jump target.
+    # moves fold only in one direction, so the pointer is checked at the
+    # farthest place it goes, <<>> at 0 still fails.
+    # each op is (op, arg, position in source).
+    prog, stack = [], []
+    for pos, c in enumerate(code):
+        if c in '+-<>':
+            op = OP_ADD if c in '+-' else OP_MOVE
+            d = 1 if c in '+>' else -1
+            if prog and prog[-1][0] == op and (
+                    op == OP_ADD or (prog[-1][1] > 0) == (d > 0)):
+                prog[-1][1] += d
+                if prog[-1][1] == 0:
+                    prog.pop(-1)
+            else:
+                prog.append([op, d, pos])
+        elif c == '[':
+            stack.append(len(prog))
+            prog.append([OP_OPEN, None, pos])
+        elif c == ']':
+            if not stack:
+                raise Exception('unmatched bracket')
+            i = stack.pop(-1)
+            prog[i][1] = len(prog)
+            prog.append([OP_CLOSE, i, pos])
+        elif c == ',':
+            prog.append([OP_IN, None, pos])
+        elif c == '.':
+            prog.append([OP_OUT, None, pos])
+    if stack:
+        raise Exception('unmatched bracket')
+    return tuple(tuple(i) for i in prog)
+
+
+CELL_TYPES = {8: 'B', 16: 'H', 32: 'I'}
+
+
+def make_tape(size, bits=8, path=None):
+    # path None for in memory, '' for anonymous mmap, others for file mmap.
+    tc = CELL_TYPES[bits]
+    itemsize = array.array(tc).itemsize
+    if path is None:
+        if bits == 8:
+            return bytearray(size)
+        return array.array(tc, bytes(size*itemsize))
+    if path == '':
+        mm = mmap.mmap(-1, size*itemsize)
+    else:
+        with open(path, 'w+b') as fo:
+            fo.truncate(size*itemsize)
+            mm = mmap.mmap(fo.fileno(), 0)
+    if bits == 8:
+        return mm
+    return memoryview(mm).cast(tc)
+
+
+def match_idiom(body):
+    # [-] and [+], cells wrap so both of them end with zero
+    if len(body) == 1 and body[0][0] == OP_ADD and abs(body[0][1]) == 1:
+        return 'clear', (OP_SET, 0)
+    # [>] and [<<], scan for the next zero cell
+    if len(body) == 1 and body[0][0] == OP_MOVE:
+        return 'scan', (OP_SCAN, body[0][1])
+    # [->+>++<<] and [+>-<], multiply current cell into others, then clear it
+    if any(op not in (OP_ADD, OP_MOVE) for op, _, _ in body):
+        return
+    off, lo, hi = 0, 0, 0
+    adds = collections.defaultdict(int)
+    for op, arg, _ in body:
+        if op == OP_MOVE:
+            off += arg
+            lo, hi = min(lo, off), max(hi, off)
+        else:
+            adds[off] += arg
+    d = adds.get(0)
+    if off != 0 or d not in (1, -1):
+        return
+    adds = tuple((o, k) for o, k in sorted(adds.items()) if o != 0 and k != 0)
+    return 'muladd', (OP_MULADD, (lo, hi, adds, d))
+
+
+@functools.lru_cache(maxsize=256)
+def optimize_code(code):
+    # rewrite the innermost loops which match an idiom into one op.
+    src = compile_code(code)
+    prog, stack = [], []
+    idioms = collections.Counter()
+    i = 0
+    while i < len(src):
+        op, arg, pos = src[i]
+        if op == OP_OPEN:
+            r = match_idiom(src[i+1:arg])
+            if r:
+                name, ins = r
+                idioms[name] += 1
+                prog.append(list(ins) + [pos])
+                i = arg + 1
+                continue
+            stack.append(len(prog))
+            prog.append([OP_OPEN, None, pos])
+        elif op == OP_CLOSE:
+            j = stack.pop(-1)
+            prog[j][1] = len(prog)
+            prog.append([OP_CLOSE, j, pos])
+        elif op == OP_ADD and prog and prog[-1][0] == OP_SET:
+            # [-]+++ is one assignment
+            prog[-1][1] += arg
+        else:
+            prog.append([op, arg, pos])
+        i += 1
+    return tuple(tuple(i) for i in prog), idioms
+
+
+def transpile(prog):
+    # pointer checks only need the direction the pointer actually moves.
+    def check(expr, arg):
+        if arg > 0:
+            return [f'if {expr} >= size: raise Exception('
+                    f"'pointer big than size')"]
+        if arg < 0:
+            return [f'if {expr} < 0: raise Exception('
+                    f"'pointer less than zero')"]
+        return []
+
+    lines = ['def run(env):',
+             ' mem, size, mask, pt = env.mem, env.size, env.mask, env.pt',
+             ' scan, getc, flush = env.scan, env.getc, env.flush',
+             ' obuf, bufsize = env.obuf, env.bufsize',
+             ' try:']
+    ind = 2
+    for pc, (op, arg, _) in enumerate(prog):
+        body = []
+        if op == OP_ADD:
+            body = [f'mem[pt] = (mem[pt] + {arg}) & mask']
+        elif op == OP_MOVE:
+            body = [f'pt += {arg}'] + check('pt', arg)
+        elif op == OP_SET:
+            body = [f'mem[pt] = {arg} & mask']
+        elif op == OP_MULADD:
+            lo, hi, adds, d = arg
+            v = 'mem[pt]' if d == -1 else '-mem[pt] & mask'
+            body = [f'v = {v}', 'if v:']
+            body += [' '+s for s in check(f'pt + {hi}', hi)]
+            body += [' '+s for s in check(f'pt + {lo}', lo)]
+            body += [f' mem[pt+{o}] = (mem[pt+{o}] + v*{k}) & mask'
+                     for o, k in adds]
+            body += [' mem[pt] = 0']
+        elif op == OP_SCAN:
+            body = [f'pt = scan(pt, {arg})']
+        elif op == OP_OPEN:
+            lines.append(' '*ind + 'while mem[pt]:')
+            ind += 1
+            if prog[pc+1][0] == OP_CLOSE:
+                lines.append(' '*ind + 'pass')
+        elif op == OP_CLOSE:
+            ind -= 1
+        elif op == OP_IN:
+            body = ['mem[pt] = getc(mem[pt]) & mask']
+        elif op == OP_OUT:
+            body = ['obuf.append(mem[pt] & 0xff)',
+                    'if len(obuf) >= bufsize: flush()']
+        lines.extend(' '*ind + s for s in body)
+    lines.append('  pass')
+    lines.append(' finally:')
+    lines.append('  env.pt = pt')
+    return '\n'.join(lines) + '\n'
+
+
+@functools.lru_cache(maxsize=256)
+def transpile_code(code, optimize=True):
+    # None if python can't take it, too many nested loops for example.
+    prog = optimize_code(code)[0] if optimize else compile_code(code)
+    try:
+        co = compile(transpile(prog), '<brainfuck>', 'exec')
+    except (SyntaxError, RecursionError, MemoryError):
+        return
+    ns = {}
+    exec(co, ns)
+    return ns['run']
 
 
 class Env(object):
 
-    def __init__(self, size=30000, debug=False):
+    def __init__(self, size=30000, profile=False, optimize=True,
+                 engine='interp', bits=8, mmap=None,
+                 fi=None, fo=None, eof=0, bufsize=8192):
         self.size = size
-        self.mem = [0,]*self.size
+        self.mem = make_tape(size, bits, mmap)
+        self.mask = (1 << bits) - 1
         self.pt = 0
-        self.debug = debug
-
-    @staticmethod
-    def find_bracket(code, i):
-        deep = 0
-        while i < len(code):
-            if code[i] == '[':
-                deep += 1
-            elif code[i] == ']':
-                deep -= 1
-            if deep == 0:
-                return i
-            i += 1
+        self.profile = Profile() if profile else None
+        self.optimize = optimize
+        self.engine = engine
+        self.fi = fi if fi is not None else sys.stdin.buffer
+        self.fo = fo if fo is not None else sys.stdout.buffer
+        # value for , at the end of input, None to keep the cell unchanged
+        self.eof = eof
+        self.bufsize = bufsize
+        self.ibuf, self.ipos = b'', 0
+        self.obuf = bytearray()
+        self.idioms = collections.Counter()
+        self.steps = 0
 
     def show_mem(self, size=16):
         return '[{}]'.format(
             ', '.join((f'*{o}' if i == self.pt else f'{o}'
                        for i, o in enumerate(self.mem[:size]))))
 
+    def load(self, code):
+        if not self.optimize:
+            prog = compile_code(code)
+        else:
+            prog, idioms = optimize_code(code)
+            self.idioms.update(idioms)
+        if self.profile is not None:
+            self.profile.add(code, prog)
+        return prog
+
     def eval(self, code):
-        i = 0
-        self.stack = []
-        while i < len(code):
-            op = code[i]
-            if self.debug:
-                print(op, self.show_mem(), self.stack)
-            if op == '>':
-                self.pt += 1
-                if self.pt >= self.size:
+        prog = self.load(code)
+        try:
+            if self.engine == 'transpile' and self.profile is None:
+                run = transpile_code(code, self.optimize)
+                if run is not None:
+                    run(self)
+                    return
+            self.interp(prog)
+        finally:
+            self.flush()
+
+    def flush(self):
+        if self.obuf:
+            self.fo.write(self.obuf)
+            self.fo.flush()
+            self.obuf.clear()
+
+    def getc(self, c):
+        if self.ipos >= len(self.ibuf):
+            # show the prompt before we wait for the input
+            self.flush()
+            read = getattr(self.fi, 'read1', self.fi.read)
+            self.ibuf, self.ipos = read(self.bufsize), 0
+            if not self.ibuf:
+                return c if self.eof is None else self.eof
+        self.ipos += 1
+        return self.ibuf[self.ipos-1]
+
+    def scan(self, pt, step):
+        mem = self.mem
+        if step in (1, -1) and hasattr(mem, 'find'):
+            if step == 1:
+                pt = mem.find(b'\0', pt)
+                if pt == -1:
                     raise Exception('pointer big than size')
-            elif op == '<':
-                self.pt -= 1
-                if self.pt < 0:
+            else:
+                pt = mem.rfind(b'\0', 0, pt+1)
+                if pt == -1:
                     raise Exception('pointer less than zero')
-            elif op == '+':
-                self.mem[self.pt] += 1
-            elif op == '-':
-                self.mem[self.pt] -= 1
-            elif op == '[':
-                if self.mem[self.pt] == 0:
-                    i = self.find_bracket(code, i)
-                else:
-                    self.stack.append(i)
-            elif op == ']':
-                i = self.stack.pop()-1
-            elif op == ',':
-                self.mem[self.pt] == ord(sys.stdin.read(1))
-            elif op == '.':
-                sys.stdout.write(chr(self.mem[self.pt]))
-            i += 1
+            return pt
+        while mem[pt]:
+            pt += step
+            if pt >= self.size:
+                raise Exception('pointer big than size')
+            if pt < 0:
+                raise Exception('pointer less than zero')
+        return pt
+
+    def snapshot(self):
+        return memoryview(self.mem).cast('B').tobytes(), self.pt, self.steps
+
+    def restore(self, snap):
+        tape, self.pt, self.steps = snap
+        memoryview(self.mem).cast('B')[:] = tape
+
+    def interp(self, prog, pc=0, budget=None):
+        # run at most budget ops, return where it stopped.
+        mem, size, mask = self.mem, self.size, self.mask
+        obuf, bufsize = self.obuf, self.bufsize
+        pt, steps, n = self.pt, 0, len(prog)
+        if self.profile is not None:
+            return self.interp_profile(prog, pc, budget)
+        stop = -1 if budget is None else budget
+        try:
+            while pc < n:
+                if steps == stop:
+                    break
+                steps += 1
+                op, arg, _ = prog[pc]
+                if op == OP_ADD:
+                    mem[pt] = (mem[pt] + arg) & mask
+                elif op == OP_MOVE:
+                    pt += arg
+                    if pt >= size:
+                        raise Exception('pointer big than size')
+                    if pt < 0:
+                        raise Exception('pointer less than zero')
+                elif op == OP_OPEN:
+                    if mem[pt] == 0:
+                        pc = arg
+                elif op == OP_CLOSE:
+                    if mem[pt] != 0:
+                        pc = arg
+                elif op == OP_SET:
+                    mem[pt] = arg & mask
+                elif op == OP_MULADD:
+                    lo, hi, adds, d = arg
+                    v = mem[pt] if d == -1 else -mem[pt] & mask
+                    if v:
+                        if pt + hi >= size:
+                            raise Exception('pointer big than size')
+                        if pt + lo < 0:
+                            raise Exception('pointer less than zero')
+                        for o, k in adds:
+                            mem[pt+o] = (mem[pt+o] + v*k) & mask
+                        mem[pt] = 0
+                elif op == OP_SCAN:
+                    pt = self.scan(pt, arg)
+                elif op == OP_IN:
+                    mem[pt] = self.getc(mem[pt]) & mask
+                elif op == OP_OUT:
+                    obuf.append(mem[pt] & 0xff)
+                    if len(obuf) >= bufsize:
+                        self.flush()
+                pc += 1
+        finally:
+            self.pt = pt
+            self.steps += steps
+        return pc
+
+
+    def interp_profile(self, prog, pc=0, budget=None):
+        # the same as interp, ops and the tape high water mark are counted.
+        mem, size, mask = self.mem, self.size, self.mask
+        obuf, bufsize = self.obuf, self.bufsize
+        pt, steps, n = self.pt, 0, len(prog)
+        counts, high = self.profile.add('', prog), self.profile.high
+        stop = -1 if budget is None else budget
+        try:
+            while pc < n:
+                if steps == stop:
+                    break
+                steps += 1
+                op, arg, _ = prog[pc]
+                counts[pc] += 1
+                top = pt + arg[1] if op == OP_MULADD else pt
+                if top > high:
+                    high = top
+                if op == OP_ADD:
+                    mem[pt] = (mem[pt] + arg) & mask
+                elif op == OP_MOVE:
+                    pt += arg
+                    if pt >= size:
+                        raise Exception('pointer big than size')
+                    if pt < 0:
+                        raise Exception('pointer less than zero')
+                elif op == OP_OPEN:
+                    if mem[pt] == 0:
+                        pc = arg
+                elif op == OP_CLOSE:
+                    if mem[pt] != 0:
+                        pc = arg
+                elif op == OP_SET:
+                    mem[pt] = arg & mask
+                elif op == OP_MULADD:
+                    lo, hi, adds, d = arg
+                    v = mem[pt] if d == -1 else -mem[pt] & mask
+                    if v:
+                        if pt + hi >= size:
+                            raise Exception('pointer big than size')
+                        if pt + lo < 0:
+                            raise Exception('pointer less than zero')
+                        for o, k in adds:
+                            mem[pt+o] = (mem[pt+o] + v*k) & mask
+                        mem[pt] = 0
+                elif op == OP_SCAN:
+                    pt = self.scan(pt, arg)
+                elif op == OP_IN:
+                    mem[pt] = self.getc(mem[pt]) & mask
+                elif op == OP_OUT:
+                    obuf.append(mem[pt] & 0xff)
+                    if len(obuf) >= bufsize:
+                        self.flush()
+                pc += 1
+        finally:
+            self.pt = pt
+            self.steps += steps
+            self.profile.high = max(high, pt)
+        return pc
+
+
+class Profile(object):
+    # execution count of each op, loops are counted by their brackets.
+
+    def __init__(self):
+        self.progs = {}
+        self.high = 0
+
+    def add(self, code, prog):
+        if id(prog) not in self.progs:
+            self.progs[id(prog)] = (code, prog, [0,]*len(prog))
+        return self.progs[id(prog)][2]
+
+    def positions(self):
+        r = collections.Counter()
+        for code, prog, counts in self.progs.values():
+            for ins, c in zip(prog, counts):
+                if c:
+                    r[code, ins[2]] += c
+        return r
+
+    def loops(self):
+        # code, position, entered, iterations, ops executed inside
+        for code, prog, counts in self.progs.values():
+            for i, (op, arg, pos) in enumerate(prog):
+                if op == OP_OPEN and counts[i]:
+                    yield (code, pos, counts[i], counts[arg],
+                           sum(counts[i:arg+1]))
+
+    def report(self, n=10, file=sys.stderr):
+        print(f'tape high water mark: {self.high}', file=file)
+        for code, pos, entered, iters, ops in sorted(
+                self.loops(), key=lambda x: -x[4])[:n]:
+            print(f'{pos}\t{ops} ops\t{iters} iterations\t'
+                  f'{entered} entered\t{code[pos:pos+40]!r}', file=file)
+
+
+class Task(object):
+    # a program runs in slices, could be paused, saved and resumed.
+
+    def __init__(self, env, code):
+        self.env = env
+        self.prog = env.load(code)
+        self.pc = 0
+
+    @property
+    def done(self):
+        return self.pc >= len(self.prog)
+
+    def run(self, budget=None):
+        try:
+            self.pc = self.env.interp(self.prog, self.pc, budget)
+        finally:
+            self.env.flush()
+        return self.done
+
+    def snapshot(self):
+        return self.env.snapshot(), self.pc
+
+    def restore(self, snap):
+        s, self.pc = snap
+        self.env.restore(s)
+
+
+def run_code(code, data=b'', **kw):
+    # run without stdio, return the output.
+    fo = io.BytesIO()
+    env = Env(fi=io.BytesIO(data), fo=fo, **kw)
+    env.eval(code)
+    return fo.getvalue()
+
+
+SLICE = 100000
+
+
+def run_job(job):
+    # run one program in a worker, in slices so time and steps are limited.
+    fn, kw, timeout, max_steps = job
+    fo = io.BytesIO()
+    env = None
+    start = time.time()
+    status = 'ok'
+    try:
+        # other chars are comments, so bytes not in utf-8 are dropped
+        with open(fn, errors='ignore') as fi:
+            code = fi.read()
+        data = b''
+        if os.path.exists(os.path.splitext(fn)[0]+'.in'):
+            with open(os.path.splitext(fn)[0]+'.in', 'rb') as fi:
+                data = fi.read()
+        env = Env(fi=io.BytesIO(data), fo=fo, **kw)
+        task = Task(env, code)
+        while True:
+            budget = SLICE
+            if max_steps is not None:
+                budget = min(budget, max_steps - env.steps)
+            if task.run(budget):
+                break
+            if max_steps is not None and env.steps >= max_steps:
+                status = 'step limit'
+                break
+            if timeout is not None and time.time() - start > timeout:
+                status = 'timeout'
+                break
+    except Exception as e:
+        status = f'error: {e}'
+    return {'file': fn, 'status': status,
+            'output': fo.getvalue().decode('latin-1'),
+            'steps': env.steps if env else 0, 'time': time.time() - start}
+
+
+def list_programs(paths):
+    for p in paths:
+        if not os.path.isdir(p):
+            yield p
+            continue
+        for fn in sorted(os.listdir(p)):
+            if fn.endswith('.bf'):
+                yield os.path.join(p, fn)
+
+
+def run_batch(paths, kw, jobs=None, timeout=None, max_steps=None):
+    # programs run in a process pool, results come back as soon as done.
+    tasks = [(fn, kw, timeout, max_steps) for fn in list_programs(paths)]
+    with multiprocessing.Pool(jobs) as pool:
+        yield from pool.imap_unordered(run_job, tasks)
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--debug', '-d', action='store_true', default=False)
+    parser.add_argument('--profile', '-p', type=int, nargs='?', const=10,
+                        metavar='N',
+                        help='count ops and show the N hottest loops')
     parser.add_argument('--size', '-s', default=30000, type=int)
+    parser.add_argument('--no-optimize', dest='optimize',
+                        action='store_false', default=True)
+    parser.add_argument('--bits', '-b', default=8, type=int,
+                        choices=sorted(CELL_TYPES))
+    parser.add_argument('--mmap', dest='mmap', action='store_const', const='',
+                        help='keep the tape in anonymous mmap')
+    parser.add_argument('--mmap-file', dest='mmap',
+                        help='keep the tape in mmap of this file, '
+                        'it will be created or overwritten')
+    parser.add_argument('--eof', default='0', choices=['0', '-1', 'keep'],
+                        help='what , reads at the end of input')
+    parser.add_argument('--engine', '-e', default='interp',
+                        choices=['interp', 'transpile'])
+    parser.add_argument('--max-steps', type=int,
+                        help='stop a program after this many ops')
+    parser.add_argument('--batch', action='append',
+                        help='run .bf files, or all of them in a directory, '
+                        'in parallel; input comes from the .in file')
+    parser.add_argument('--jobs', '-j', type=int)
+    parser.add_argument('--timeout', type=float,
+                        help='seconds for each program in batch')
+    parser.add_argument('--idioms', action='store_true', default=False,
+                        help='show which loop idioms have been rewritten')
     parser.add_argument('--file', '-f', action='append')
     parser.add_argument('rest', nargs='*', type=str)
     args = parser.parse_args()
 
-    env = Env(size=args.size, debug=args.debug)
+    if args.mmap and (set(args.mmap) <= set('+-<>[].,') or
+                      args.mmap.endswith('.bf')):
+        # the program is taken as file name, it will be overwritten
+        parser.error(f'--mmap-file {args.mmap} looks like brainfuck code')
 
+    eof = None if args.eof == 'keep' else int(args.eof)
+    if args.batch:
+        kw = {'size': args.size, 'optimize': args.optimize,
+              'bits': args.bits, 'eof': eof}
+        for r in run_batch(args.batch, kw, args.jobs,
+                           args.timeout, args.max_steps):
+            print(json.dumps(r), flush=True)
+        return
+
+    env = Env(size=args.size, profile=args.profile is not None,
+              optimize=args.optimize,
+              engine=args.engine, bits=args.bits, mmap=args.mmap, eof=eof)
+
+    codes = []
     if args.file:
         for fn in args.file:
             if fn == '-':
-                env.eval(sys.stdin.read())
+                codes.append(sys.stdin.read())
             else:
                 with open(fn) as fi:
-                    env.eval(fi.read())
+                    codes.append(fi.read())
+    codes.extend(args.rest)
+
+    for code in codes:
+        if args.max_steps is None:
+            env.eval(code)
+        elif not Task(env, code).run(args.max_steps):
+            print(f'stopped after {args.max_steps} steps', file=sys.stderr)
+            break
 
-    for code in args.rest:
-        env.eval(code)
+    if args.idioms:
+        print(dict(env.idioms), file=sys.stderr)
+    if env.profile is not None:
+        env.profile.report(args.profile)
 
 
 if __name__ == '__main__':
@@ -7,6 +7,12 @@
 @license: BSD-3-clause
 '''
 import sys
+import time
+import argparse
+import multiprocessing
+
+from interpreter import run_code
+
 
 def resolv_N(s, N=9):
     groups = {i//N for i in s}
@@ -35,19 +41,121 @@ def resolv_N(s, N=9):
     return cmd
 
 
+def init_code(N, ks):
+    # cell 0 is the loop counter, it ends with 0 and could be used as well.
+    if N == 0:
+        return '', (0,)*(len(ks)+1)
+    ctl = ''.join(['>'+'+'*k for k in ks])
+    cmd = '+'*N+f'[{ctl}{"<"*len(ks)}-]'
+    return cmd, (0,)+tuple(N*k & 0xff for k in ks)
+
+
+def delta(a, b):
+    # cells are 8 bits, so going through 0 may be shorter.
+    d = (b - a) & 0xff
+    return '+'*d if d <= 128 else '-'*(256-d)
+
+
+def plan(s, vals, beam):
+    # dp over (pointer, cell values), only the cheapest states are kept.
+    states = {(0, vals): (0, None, None)}
+    history = []
+    for o in s:
+        nexts = {}
+        for (pt, vs), (cost, _, _) in states.items():
+            for c, v in enumerate(vs):
+                d = (o - v) & 0xff
+                cc = cost + abs(c - pt) + min(d, 256-d) + 1
+                ns = (c, vs[:c]+(o,)+vs[c+1:])
+                if ns not in nexts or cc < nexts[ns][0]:
+                    nexts[ns] = (cc, (pt, vs), c)
+        if len(nexts) > beam:
+            nexts = dict(sorted(nexts.items(), key=lambda x: x[1][0])[:beam])
+        history.append(nexts)
+        states = nexts
+    st = min(states, key=lambda k: states[k][0])
+    cells = []
+    for h in reversed(history):
+        _, prev, c = h[st]
+        cells.append(c)
+        st = prev
+    return cells[::-1]
+
+
+def render(s, N, ks, cells):
+    cmd, vals = init_code(N, ks)
+    vals, pt = list(vals), 0
+    for o, c in zip(s, cells):
+        cmd += '>'*(c-pt) if c > pt else '<'*(pt-c)
+        cmd += delta(vals[c], o) + '.'
+        vals[c], pt = o, c
+    return cmd
+
+
+def candidate(job):
+    s, N, ks, beam = job
+    return render(s, N, ks, plan(s, init_code(N, ks)[1], beam))
+
+
+def clusters(values, k):
+    # split sorted values at the k-1 widest gaps, return medians.
+    values = sorted(set(values))
+    gaps = sorted(range(1, len(values)),
+                  key=lambda i: values[i-1]-values[i])[:k-1]
+    bounds = [0] + sorted(gaps) + [len(values)]
+    return [values[(bounds[i]+bounds[i+1])//2] for i in range(len(bounds)-1)]
+
+
+def layouts(s, max_cells=6):
+    yield 0, ()
+    seen = set()
+    for k in range(1, min(max_cells, len(set(s)))+1):
+        medians = clusters(s, k)
+        for N in range(2, 21):
+            ks = tuple(round(m/N) for m in medians)
+            if ks not in seen and all(ks):
+                seen.add(ks)
+                yield N, ks
+            # cells in the order they are first used
+            first = {}
+            for o in s:
+                first.setdefault(round(o/N), len(first))
+            ks = tuple(sorted(set(ks), key=lambda x: first.get(x, 256)))
+            if ks not in seen and all(ks):
+                seen.add(ks)
+                yield N, ks
+
+
+def search(s, budget=10, beam=64, jobs=None, max_cells=6):
+    # the shortest program found in budget seconds.
+    best = min((resolv_N(s, i) for i in range(5, 20)), key=len)
+    start = time.time()
+    tasks = [(s, N, ks, beam) for N, ks in layouts(s, max_cells)]
+    with multiprocessing.Pool(jobs) as pool:
+        for cmd in pool.imap_unordered(candidate, tasks):
+            if len(cmd) < len(best):
+                best = cmd
+            if time.time() - start > budget:
+                break
+    if run_code(best) != bytes(s):
+        raise Exception('generated code not match')
+    return best
+
+
 def main():
-    s = sys.argv[1]
-    s = list(map(ord, s))
-    # print(s)
-    size = -1
-    best = ''
-    for i in range(5, 20):
-        cmd = resolv_N(s, i)
-        if size == -1 or len(cmd) < size:
-            N = i
-            best = cmd
-            size = len(cmd)
-    print(f'N={N}, groups={ {i//N for i in s} }, size={size}', file=sys.stderr)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget', '-t', type=float, default=10,
+                        help='seconds for search')
+    parser.add_argument('--beam', '-b', type=int, default=64,
+                        help='states kept in each step')
+    parser.add_argument('--cells', '-c', type=int, default=6)
+    parser.add_argument('--jobs', '-j', type=int)
+    parser.add_argument('s')
+    args = parser.parse_args()
+
+    s = list(args.s.encode('utf-8'))
+    best = search(s, args.budget, args.beam, args.jobs, args.cells)
+    print(f'size={len(best)}', file=sys.stderr)
     print(best)
 
 
@@ -6,174 +6,491 @@
 @copyright: 2019, Shell.Xu <shell909090@gmail.com>
 @license: BSD-3-clause
 '''
+import sys
+import mmap
+import contextlib
 import time
 import pprint
 import random
 import argparse
 import itertools
-import collections
+import multiprocessing
 
 import numpy as np
 
 
-def seta(a, s, t):
-    a[a==s] = t
-
-
-def mark_xy(m, x, y):
-    seta(m[x, :], 0, -1)
-    seta(m[:, y], 0, -1)
-    i, j = x-x%3, y-y%3
-    seta(m[i:i+3, j:j+3], 0, -1)
-
-
-def check(m, f):
-    for i in range(0, 9):
-        if f(m[i, :]):
-            return i, -1
-        if f(m[:, i]):
-            return -1, i
-    for i in range(0, 3):
-        for j in range(0, 3):
-            a = m[i*3:i*3+3, j*3:j*3+3]
-            if f(a.flatten()):
-                return i, j
+# digit n is bit n-1 of a mask, a mask of all 9 digits is ALL.
+ALL = 0x1ff
+DIGIT = {1 << n: n+1 for n in range(9)}
+POPCOUNT = [bin(m).count('1') for m in range(ALL+1)]
+ROW = [i // 9 for i in range(81)]
+COL = [i % 9 for i in range(81)]
+BOX = [i // 27 * 3 + i % 9 // 3 for i in range(81)]
+CELLS = list(zip(range(81), ROW, COL, BOX))
+# rows, cols, then boxes, in cell index of x*9+y
+UNITS = [[i for i in range(81) if ROW[i] == k] for k in range(9)] + \
+    [[i for i in range(81) if COL[i] == k] for k in range(9)] + \
+    [[i for i in range(81) if BOX[i] == k] for k in range(9)]
 
 
 class Sudoku(object):
+    # cells are numbers of x*9+y, 0 for empty. rows, cols and boxes are
+    # masks of digits used, so candidates of a cell are ALL without them.
 
     def __init__(self, quiz):
         self.quiz = np.array(quiz)
-        self.cur = self.quiz.copy()
-        self.flagmaps = np.array([self.cur,]*9)
+        self.cells = [0] * 81
+        self.rows, self.cols, self.boxes = [0] * 9, [0] * 9, [0] * 9
         self.moves = []
-        for n in range(1, 10):
-            m = self.flagmaps[n-1, :, :]
-            for x, y in np.array(np.where(m == n)).transpose():
-                mark_xy(m, x, y)
+        # the same digit given twice in a unit
+        self.invalid = False
+        for i, n in enumerate(self.quiz.flatten()):
+            if n > 0:
+                self.place(i, int(n))
+
+    @property
+    def cur(self):
+        return np.array(self.cells).reshape(9, 9)
+
+    def place(self, i, n):
+        b = 1 << (n-1)
+        if (self.rows[ROW[i]] | self.cols[COL[i]] | self.boxes[BOX[i]]) & b:
+            self.invalid = True
+        self.cells[i] = n
+        self.rows[ROW[i]] |= b
+        self.cols[COL[i]] |= b
+        self.boxes[BOX[i]] |= b
+
+    def remove(self, i):
+        b = ~(1 << (self.cells[i]-1))
+        self.cells[i] = 0
+        self.rows[ROW[i]] &= b
+        self.cols[COL[i]] &= b
+        self.boxes[BOX[i]] &= b
+
+    def candidates(self, i):
+        if self.cells[i]:
+            return 0
+        return ALL & ~(self.rows[ROW[i]] | self.cols[COL[i]] |
+                       self.boxes[BOX[i]])
+
+    def all_candidates(self):
+        rows, cols, boxes, cells = self.rows, self.cols, self.boxes, self.cells
+        return [0 if cells[i] else ALL & ~(rows[r] | cols[c] | boxes[b])
+                for i, r, c, b in CELLS]
 
     def fill(self, x, y, n, c):
-        if self.cur[x, y] > 0:
+        if self.cells[x*9+y] > 0:
             raise Exception('number existed in this place: %d, %d' % (x, y))
-        self.cur[x, y] = n
+        self.place(x*9+y, n)
         self.moves.append((x, y, n, c))
-        self.flagmaps[:, x, y] = n
-        mark_xy(self.flagmaps[n-1, :, :], x, y)
+
+    def unfill(self):
+        # undo the last fill
+        x, y, n, c = self.moves.pop(-1)
+        self.remove(x*9+y)
+        return x, y, n, c
 
     def is_balanced(self):
-        ele = list(range(1, 10))
-        return check(self.cur, 
-                     lambda a: sorted(a) != ele) == None
+        # every digit in every unit, so all 81 cells are different in units
+        return all(m == ALL for m in self.rows + self.cols + self.boxes)
 
     def is_full(self):
-        return not collections.Counter(self.cur.flatten()).get(0)
+        return 0 not in self.cells
 
-    def find_pos(self, n):
-        m = self.flagmaps[n-1, :, :]
-        r = check(m, lambda a: collections.Counter(a).get(0) == 1)
-        if r is None:
-            return
-        x, y = r
-        if x == -1:
-            x = np.where(m[:, y]==0)[0][0]
-        elif y == -1:
-            y = np.where(m[x, :]==0)[0][0]
-        else:
-            i, j = np.where(m[3*x:3*x+3, 3*y:3*y+3]==0)
-            x, y = 3*x+i[0], 3*y+j[0]
-        return x, y
-
-    def fill_n(self, n):
-        r = self.find_pos(n)
-        while r:
-            x, y = r
-            self.fill(x, y, n, 'n')
-            r = self.find_pos(n)
+    def fill_n(self):
+        # hidden single: a digit seen in only one cell of a unit.
+        # return False if a digit has no place in a unit.
+        # found in candidates before any fill, and checked when fill.
+        cands = self.all_candidates()
+        for unit, used in zip(UNITS, self.rows + self.cols + self.boxes):
+            once = twice = 0
+            for i in unit:
+                m = cands[i]
+                twice |= once & m
+                once |= m
+            if once | used != ALL:
+                return False
+            m = once & ~twice
+            while m:
+                b = m & -m
+                m ^= b
+                for i in unit:
+                    # may be filled by another digit just now
+                    if self.candidates(i) & b:
+                        self.fill(ROW[i], COL[i], DIGIT[b], 'n')
+                        break
+        return True
 
     def fill_one(self):
-        ele = [-1, -1, -1, -1, -1, -1, -1, -1, 0]
-        for x in range(0, 9):
-            for y in range(0, 9):
-                if self.cur[x, y] != 0:
-                    continue
-                a = self.flagmaps[:, x, y]
-                if sorted(a) == ele:
-                    n = np.where(a==0)[0][0]
-                    self.fill(x, y, n+1, 'one')
+        # naked single: a cell with only one candidate.
+        # return False if an empty cell has no candidate.
+        for i, m in enumerate(self.all_candidates()):
+            if self.cells[i]:
+                continue
+            if not m:
+                return False
+            if not m & (m-1):
+                # may be taken by the cells filled just now
+                m = self.candidates(i)
+                if not m:
+                    return False
+                self.fill(ROW[i], COL[i], DIGIT[m], 'one')
+        return True
 
     def resolve(self):
+        # singles till nothing changed, False if there is no solution.
+        if self.invalid:
+            return False
         l = -1
         while len(self.moves) != l:
             l = len(self.moves)
-            for n in range(1, 10):
-                self.fill_n(n)
-            self.fill_one()
-
-    def generate_fill(self, n):
-        m = self.flagmaps[n-1, :, :]
-        zeros = np.array(np.where(m == 0)).transpose()
-        if not len(zeros):
-            return
-        x, y = random.choice(zeros)
-        self.fill(x, y, n, 'gen')
-        return x, y, n
+            if not self.fill_n() or not self.fill_one():
+                return False
+        return True
+
+    def search(self, solutions, limit):
+        # guess on the cell with least candidates, after singles.
+        # it's restored to the same as called.
+        mark = len(self.moves)
+        if self.resolve():
+            best, count = None, 10
+            for i, m in enumerate(self.all_candidates()):
+                if not self.cells[i] and POPCOUNT[m] < count:
+                    best, count = i, POPCOUNT[m]
+            if best is None:
+                solutions.append(self.cells[:])
+            else:
+                m = self.candidates(best)
+                while m and len(solutions) < limit:
+                    b = m & -m
+                    m ^= b
+                    self.fill(ROW[best], COL[best], DIGIT[b], 'guess')
+                    self.search(solutions, limit)
+                    self.unfill()
+        while len(self.moves) > mark:
+            self.unfill()
+
+    def solve(self, limit=1):
+        # all solutions up to limit, as 9x9 arrays.
+        solutions = []
+        self.search(solutions, limit)
+        return [np.array(s).reshape(9, 9) for s in solutions]
+
+    def count_solutions(self, limit=2):
+        solutions = []
+        self.search(solutions, limit)
+        return len(solutions)
+
+    def is_unique(self):
+        # stop at the second solution
+        return self.count_solutions(2) == 1
 
     def is_resolvable(self):
-        self.resolve()
-        return self.is_balanced()
+        # by singles only, it's restored after
+        mark = len(self.moves)
+        r = self.resolve() and self.is_full()
+        while len(self.moves) > mark:
+            self.unfill()
+        return r
 
-    def mask_one_path(self):
-        m = self.cur.copy()
-        coords = list(itertools.product(range(0, 9), range(0, 9)))
-        while True:
-            random.shuffle(coords)
-            for x, y in coords:
-                m1 = m.copy()
-                m1[x, y] = 0
-                if Sudoku(m1).is_resolvable():
-                    coords.remove((x, y))
-                    m = m1
-                    break
-            else:
-                return len(coords), m
+    def has_other(self, i, n):
+        # any solution with a digit other than n in empty cell i
+        m = self.candidates(i) & ~(1 << (n-1))
+        solutions = []
+        while m and not solutions:
+            b = m & -m
+            m ^= b
+            self.fill(ROW[i], COL[i], DIGIT[b], 'guess')
+            self.search(solutions, 1)
+            self.unfill()
+        return bool(solutions)
+
+    def mask_one_path(self, singles=False):
+        # remove numbers in random order, on one Sudoku. a number is put
+        # back if the quiz is not unique, or can't be resolved by singles.
+        # fewer numbers never makes it better, so one pass is enough.
+        s = Sudoku(self.cur)
+        coords = list(range(81))
+        random.shuffle(coords)
+        for i in coords:
+            n = s.cells[i]
+            s.remove(i)
+            # it's unique before, so another solution must differ at i
+            if s.is_resolvable() if singles else not s.has_other(i, n):
+                continue
+            s.place(i, n)
+        return 81 - s.cells.count(0), s.cur
 
-    def mask_quiz(self, n):
-        c, m = min((self.mask_one_path() for _ in range(n)),
-                   key=lambda x: x[0])
+    def mask_quiz(self, n, singles=False, jobs=None):
+        # n paths in parallel, the one with least numbers wins
+        tasks = [(self.cells, singles, random.getrandbits(32))
+                 for _ in range(n)]
+        with multiprocessing.Pool(jobs) as pool:
+            c, m = min(pool.map(mask_path, tasks), key=lambda x: x[0])
         print('best one has %d numbers' % c)
         return Sudoku(m)
 
     @classmethod
     def generate(cls):
-        m = np.zeros((9, 9), dtype=int)
-        row = list(range(1, 10))
-        random.shuffle(row)
-        m[4, :] = row
-        for i in range(10):
-            s = cls(m)
-            c = collections.Counter(s.cur.flatten())
-            while c.get(0):
-                n = random.choice([k for k, v in c.items() if k != 0 and v < 9])
-                if not s.generate_fill(n):
-                    break
-                s.resolve()
-                c = collections.Counter(s.cur.flatten())
-            else:
-                print('generate matrix %d times' % i)
-                return s
+        return cls(transform(random_grid()))
+
+
+def random_grid():
+    # boxes on the diagonal don't share any unit, so they could be any
+    # permutation. then the first solution fills the rest.
+    m = np.zeros((9, 9), dtype=int)
+    for k in range(3):
+        box = random.sample(range(1, 10), 9)
+        m[3*k:3*k+3, 3*k:3*k+3] = np.array(box).reshape(3, 3)
+    return Sudoku(m).solve()[0]
+
+
+def shuffle_lines():
+    # lines shuffled in each band, and bands shuffled
+    return np.array([3*b + i for b in random.sample(range(3), 3)
+                     for i in random.sample(range(3), 3)])
+
+
+def transform(grid):
+    # a random one of the grids with the same solution structure:
+    # digits relabeled, rows and cols swapped in bands, bands swapped,
+    # and transposed.
+    grid = np.asarray(grid)[shuffle_lines()][:, shuffle_lines()]
+    if random.getrandbits(1):
+        grid = grid.T
+    return np.array([0] + random.sample(range(1, 10), 9))[grid]
+
+
+def generate_grids(n=None, reseed=1000):
+    # n grids, or endless. a new grid is searched every reseed grids,
+    # others are transformed from it.
+    count = itertools.count() if n is None else range(n)
+    for i in count:
+        if i % reseed == 0:
+            grid = random_grid()
+        yield transform(grid)
+
+
+def mask_path(job):
+    cells, singles, seed = job
+    # workers forked with the same random state
+    random.seed(seed)
+    return Sudoku(np.array(cells).reshape(9, 9)).mask_one_path(singles)
+
+
+# the same for numpy, unit of cells, and bit count or digit of masks
+UNITS_NP = np.array(UNITS)
+CELL_UNITS = np.array([ROW, [9+c for c in COL], [18+b for b in BOX]])
+BIT_NP = np.array([0] + list(DIGIT), dtype=np.int16)
+POPCOUNT_NP = np.array(POPCOUNT, dtype=np.int8)
+DIGIT_NP = np.zeros(ALL+1, dtype=np.int8)
+for b, n in DIGIT.items():
+    DIGIT_NP[b] = n
+
+
+def propagate_batch(grids):
+    # singles on (N, 81) grids at once, the same as resolve, in int16 masks.
+    # return grids and which ones have no solution.
+    grids = grids.copy()
+    invalid = np.zeros(len(grids), dtype=bool)
+    # grids changed in the last round
+    active = np.arange(len(grids))
+    while len(active):
+        g = grids[active]
+        bits = BIT_NP[g]
+        cells = bits[:, UNITS_NP]
+        used = np.bitwise_or.reduce(cells, axis=2)
+        # the same digit twice in a unit
+        bad = (POPCOUNT_NP[cells].sum(axis=2) != POPCOUNT_NP[used]).any(axis=1)
+        taken = used[:, CELL_UNITS]
+        cand = np.where(g == 0, ALL & ~(taken[:, 0] | taken[:, 1] |
+                                        taken[:, 2]), 0)
+        bad |= ((g == 0) & (cand == 0)).any(axis=1)
+        # hidden single: seen once but not twice in a unit
+        once = np.zeros_like(used)
+        twice = np.zeros_like(used)
+        for c in np.moveaxis(cand[:, UNITS_NP], 2, 0):
+            twice |= once & c
+            once |= c
+        bad |= ((once | used) != ALL).any(axis=1)
+        hidden = once & ~twice
+        hidden = hidden[:, CELL_UNITS]
+        fills = np.where(POPCOUNT_NP[cand] == 1, cand, cand & (
+            hidden[:, 0] | hidden[:, 1] | hidden[:, 2]))
+        # two digits for one cell
+        bad |= (POPCOUNT_NP[fills] > 1).any(axis=1)
+        fills[bad] = 0
+        invalid[active[bad]] = True
+        g += DIGIT_NP[fills]
+        grids[active] = g
+        active = active[(fills != 0).any(axis=1)]
+    return grids, invalid
+
+
+def solve_batch(quizzes, unique=False):
+    # solve (N, 9, 9) quizzes, singles for all in numpy, then search the
+    # rest one by one. status of each is propagated, searched, multiple
+    # (more than one solutions, when unique) or invalid (no solution).
+    grids, invalid = propagate_batch(
+        np.asarray(quizzes, dtype=np.int8).reshape(-1, 81))
+    status = ['invalid' if bad else 'propagated' for bad in invalid]
+    for i in np.where(~invalid & (grids == 0).any(axis=1))[0]:
+        solutions = Sudoku(grids[i].reshape(9, 9)).solve(2 if unique else 1)
+        if not solutions:
+            grids[i] = 0
+            status[i] = 'invalid'
+            continue
+        grids[i] = solutions[0].flatten()
+        status[i] = 'searched' if len(solutions) == 1 else 'multiple'
+    grids[invalid] = 0
+    return grids.reshape(-1, 9, 9), status
+
+
+# '.' and '0' for blanks in the 81 characters format
+BLANKS = bytes.maketrans(b'.', b'0')
+
+
+def parse_line(line):
+    line = line.strip().translate(BLANKS)
+    if len(line) != 81 or not line.isdigit():
+        raise Exception('not a quiz line: %r' % line)
+    return (np.frombuffer(line, dtype=np.uint8) - 48).reshape(9, 9)
+
+
+def format_line(grid):
+    # the same format, '.' for blanks
+    return (np.asarray(grid, dtype=np.uint8).flatten() + 48).tobytes() \
+        .replace(b'0', b'.')
+
+
+def quiz_lines(lines):
+    # empty lines and lines start with '#' are skipped.
+    for line in lines:
+        if line.strip() and not line.startswith(b'#'):
+            yield line
+
+
+def read_lines(path):
+    # lines of file, mapped into memory if it could be, '-' for stdin.
+    if path == '-':
+        yield from quiz_lines(sys.stdin.buffer)
+        return
+    with open(path, 'rb') as fi:
+        try:
+            mm = mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # empty file or pipe
+            yield from quiz_lines(fi)
+            return
+        with mm:
+            yield from quiz_lines(iter(mm.readline, b''))
+
+
+def read_quizzes(path):
+    # None for a line which is not a quiz
+    for line in read_lines(path):
+        try:
+            yield parse_line(line)
+        except Exception:
+            yield None
+
+
+def read_batches(path, size=10000):
+    # (N, 9, 9) arrays of no more than size quizzes, and which of them are
+    # bad lines, blanks in the array.
+    quizzes = read_quizzes(path)
+    while True:
+        batch = list(itertools.islice(quizzes, size))
+        if not batch:
+            return
+        bad = np.array([q is None for q in batch])
+        blank = np.zeros((9, 9), dtype=np.uint8)
+        yield np.array([blank if q is None else q for q in batch]), bad
+
+
+@contextlib.contextmanager
+def open_output(path):
+    if path in (None, '-'):
+        yield sys.stdout.buffer
+        return
+    with open(path, 'wb') as fo:
+        yield fo
+
+
+def solve_file(path, output=None, unique=False, status=False, size=10000):
+    # one solution line for one quiz, in the same order. blanks for invalid,
+    # and for lines which are not quiz.
+    with open_output(output) as fo:
+        for quizzes, bad in read_batches(path, size):
+            grids = np.zeros(quizzes.shape, dtype=np.int8)
+            states = np.full(len(quizzes), 'invalid', dtype=object)
+            grids[~bad], states[~bad] = solve_batch(quizzes[~bad], unique)
+            for grid, state in zip(grids, states):
+                fo.write(format_line(grid))
+                if status:
+                    fo.write(b' ' + state.encode())
+                fo.write(b'\n')
+            fo.flush()
+
+
+def generate_file(n, output=None, full=False, singles=False, jobs=None,
+                  size=1000):
+    # n quizzes, one mask cycle for each. or n grids if full.
+    grids = generate_grids(n)
+    with open_output(output) as fo, multiprocessing.Pool(jobs) as pool:
+        while True:
+            batch = list(itertools.islice(grids, size))
+            if not batch:
+                return
+            if not full:
+                tasks = [(g.flatten().tolist(), singles, random.getrandbits(32))
+                         for g in batch]
+                batch = [m for _, m in pool.imap(mask_path, tasks, 16)]
+            fo.write(b''.join(format_line(g) + b'\n' for g in batch))
+            fo.flush()
 
 
 def main():
+    def add_common(p, singles=False, jobs=None):
+        p.add_argument('--singles', '-s',
+                       action='store_true', default=singles)
+        p.add_argument('--jobs', '-j', type=int, default=jobs)
+
     parser = argparse.ArgumentParser()
     parser.add_argument('--maskcycle', '-m',
                         type=int, default=10)
     parser.add_argument('--resolve', '-r',
                         action='store_true', default=False)
+    add_common(parser)
+    subparsers = parser.add_subparsers(dest='command')
+    p = subparsers.add_parser('solve', help='solve quizzes in lines')
+    p.add_argument('--unique', '-u', action='store_true', default=False,
+                   help='check if there is more than one solution')
+    p.add_argument('--status', action='store_true', default=False,
+                   help='status after solution')
+    p.add_argument('--output', '-o')
+    p.add_argument('file', nargs='?', default='-')
+    p = subparsers.add_parser('generate', help='generate quizzes in lines')
+    p.add_argument('--count', '-n', type=int, default=1)
+    p.add_argument('--full', '-f', action='store_true', default=False,
+                   help='grids without masked')
+    p.add_argument('--output', '-o')
+    # also after generate, suppressed to keep those given before it
+    add_common(p, argparse.SUPPRESS, argparse.SUPPRESS)
     args = parser.parse_args()
 
+    if args.command == 'solve':
+        solve_file(args.file, args.output, args.unique, args.status)
+        return
+    if args.command == 'generate':
+        generate_file(args.count, args.output, args.full, args.singles,
+                      args.jobs)
+        return
+
     s = Sudoku.generate()
     print(s.cur)
-    q = s.mask_quiz(args.maskcycle)
+    q = s.mask_quiz(args.maskcycle, args.singles, args.jobs)
     if not q:
         print('no quiz match')
     else:
@@ -182,6 +499,9 @@ def main():
     if args.resolve:
         q.resolve()
         pprint.pprint(q.moves)
+        if not q.is_full():
+            # singles are not enough, guess the rest
+            print(q.solve()[0])
 
 
 if __name__ == '__main__':